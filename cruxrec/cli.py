@@ -1,5 +1,8 @@
 import argparse
+import asyncio
 import logging
+import os
+import sys
 
 from utils import setup_logging
 from pipline import Pipline
@@ -22,16 +25,47 @@ def main() -> None:
         action="store_true",
         help="Use auto-generated subtitles if official ones are not available.",
     )
+    parser.add_argument(
+        "--reduce-tokens",
+        choices=["off", "light", "moderate"],
+        default="off",
+        help="Shrink subtitles before summarization to save LLM input tokens "
+        "(default: 'off').",
+    )
 
     args = parser.parse_args()
 
     setup_logging()
 
     logger = logging.getLogger("cli")
+
+    # Validate keys up front: a missing GEMINI_KEY would otherwise only be
+    # noticed after the subtitle download has already been paid for.
+    gemini_key = os.environ.get("GEMINI_KEY")
+    if not gemini_key:
+        logger.error(
+            "Error: Missing required local variable 'GEMINI_KEY'. Please set it before running the application."
+        )
+        sys.exit(2)
+
+    openai_key = os.environ.get("OPENAI_API_KEY")
+    if not openai_key:
+        logger.warning(
+            "'OPENAI_API_KEY' is not set: transcription fallback for videos "
+            "without subtitles will be unavailable."
+        )
+
     logger.info("Fetching subtitles...")
 
-    pipline = Pipline(args.prompt, args.url, args.lang)
-    print(pipline.start())
+    pipline = Pipline(
+        args.prompt,
+        args.url,
+        args.lang,
+        gemini_key=gemini_key,
+        openai_key=openai_key,
+        reduce_tokens=args.reduce_tokens,
+    )
+    print(asyncio.run(pipline.start()))
 
 
 if __name__ == "__main__":
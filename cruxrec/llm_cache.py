@@ -0,0 +1,97 @@
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+
+# Optional speedups: orjson serializes ~5-10x faster than stdlib json and
+# blake3 hashes several times faster than sha256. Both are drop-in here and
+# the cache works fine without them (keys differ, so entries just miss once).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")
+
+
+def _loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _digest(data: bytes) -> str:
+    if blake3 is not None:
+        return blake3.blake3(data).hexdigest()
+    return hashlib.sha256(data).hexdigest()
+
+
+class LLMCache:
+    """
+    Disk-backed cache for LLM responses.
+    Keys are digests of the canonical request (model, prompt, input text) -
+    blake3 when installed, sha256 otherwise; entries expire after a TTL and
+    persist to a JSON file between runs.
+    """
+
+    def __init__(
+        self,
+        cache_file: Path = Path("data/llm_cache.json"),
+        ttl_s: int = 7 * 24 * 3600,
+    ) -> None:
+        self.cache_file = cache_file
+        self.ttl_s = ttl_s
+        self.logger = logging.getLogger("services")
+        self._entries = self._load()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, text: str) -> str:
+        return _digest(_dumps({"m": model, "p": prompt, "s": text}))
+
+    def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if time.time() - entry["ts"] > self.ttl_s:
+            self.logger.debug(f"Cache entry '{key}' expired. Dropping it.")
+            del self._entries[key]
+            self._save()
+            return None
+
+        self.logger.debug(f"Cache hit for key '{key}'.")
+        return entry["value"]
+
+    def set(self, key: str, value: str) -> None:
+        self._entries[key] = {"value": value, "ts": time.time()}
+        self._save()
+
+    def _load(self) -> dict:
+        if not self.cache_file.exists():
+            return {}
+        try:
+            return _loads(self.cache_file.read_bytes())
+        except (IOError, ValueError) as exc:
+            self.logger.warning(
+                f"Failed to read cache file '{self.cache_file}': {exc}. Starting empty."
+            )
+            return {}
+
+    def _save(self) -> None:
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            self.cache_file.write_bytes(_dumps(self._entries))
+        except IOError as exc:
+            self.logger.warning(
+                f"Failed to write cache file '{self.cache_file}': {exc}", exc_info=exc
+            )
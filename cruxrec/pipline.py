@@ -1,55 +1,104 @@
+import asyncio
 import logging
 import os
 import sys
+import token_reduction
+from llm_cache import LLMCache
 from summarizer import GeminiSummarizer
 from subs_provider import SubsProvider
 from transcriber import Transcriber
 
 
 class Pipline:
-    def __init__(self, prompt: str, url: str, lang: str = "ru") -> None:
+    def __init__(
+        self,
+        prompt: str,
+        url: str,
+        lang: str = "ru",
+        gemini_key: str | None = None,
+        openai_key: str | None = None,
+        reduce_tokens: str = "off",
+    ) -> None:
         self.prompt = prompt
         self.url = url
         self.lang = lang
+        self.reduce_tokens = reduce_tokens
+        self.gemini_key = gemini_key or os.environ.get("GEMINI_KEY")
+        self.openai_key = openai_key or os.environ.get("OPENAI_API_KEY")
         self.logger = logging.getLogger("services")
 
-    def start(self) -> str | None:
+    async def start(self) -> str | None:
         self.logger.debug("Pipline has been started")
 
-        try:
-            key = os.environ["GEMINI_KEY"]
-        except KeyError:
+        if not self.gemini_key:
             self.logger.error(
                 "Error: Missing required local variable 'GEMINI_KEY'. Please set it before running the application."
             )
             sys.exit(1)
 
         subtitles_provider = SubsProvider()
-        subtitles_text = subtitles_provider.fetch_subtitles(self.url, self.lang)
+        subs_task = asyncio.create_task(
+            subtitles_provider.fetch_subtitles_async(self.url, self.lang)
+        )
 
-        if not subtitles_text:
+        # Speculatively prefetch the video metadata for the Whisper fallback
+        # while subtitles are fetched. The download itself only starts once
+        # subtitles have actually failed: a started yt-dlp download cannot be
+        # aborted mid-flight, so cancelling it would keep writing files and
+        # hold the process open past the printed summary.
+        transcriber = Transcriber(self.openai_key) if self.openai_key else None
+        prefetch_task = (
+            asyncio.create_task(transcriber.prefetch_video_info(self.url))
+            if transcriber
+            else None
+        )
+
+        subtitles_text = await subs_task
+
+        if subtitles_text:
+            if prefetch_task:
+                prefetch_task.cancel()
+                try:
+                    await prefetch_task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        else:
             self.logger.warning(
                 "Failed to retrieve subtitles. The video may not have any available."
             )
-            try:
-                openai_key = os.environ["OPENAI_API_KEY"]
-            except KeyError:
+            if transcriber is None:
                 self.logger.error(
                     "Error: Missing required local variable 'OPENAI_API_KEY'. Please set it before running the application."
                 )
                 sys.exit(1)
 
-            transcriber = Transcriber(openai_key)
-            subtitles_text = transcriber.transcribe_from_url(self.url)
+            try:
+                await prefetch_task
+            except Exception:
+                self.logger.debug("Metadata prefetch failed; downloading cold.")
+
+            subtitles_text = await transcriber.transcribe_from_url(self.url)
 
         if not subtitles_text:
             self.logger.error("Failed to transribe subtitles from video")
             return None
 
         try:
-            summarizer = GeminiSummarizer(key, self.prompt)
+            summarizer = GeminiSummarizer(self.gemini_key, self.prompt)
             if isinstance(subtitles_text, str):
+                subtitles_text = token_reduction.reduce(
+                    subtitles_text, mode=self.reduce_tokens, language=self.lang
+                )
+                cache = LLMCache()
+                cache_key = LLMCache.make_key("gemini", self.prompt, subtitles_text)
+                summary = cache.get(cache_key)
+                if summary is not None:
+                    self.logger.debug("Returning cached summary, skipping Gemini call.")
+                    return summary
+
                 summary = summarizer.summarize(subtitles_text)
+                if summary:
+                    cache.set(cache_key, summary)
                 return summary
         except Exception:
             self.logger.exception("Error occurred during summarization.")
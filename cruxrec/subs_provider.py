@@ -1,106 +1,235 @@
+import asyncio
+import fnmatch
+import json
 import logging
+import os
 import re
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, Iterator, Optional
 
+import requests
 from yt_dlp import YoutubeDL
 
+timestamp_re = re.compile(r"^\d{2}:\d{2}:\d{2}\.\d+\s*-->\s*\d{2}:\d{2}:\d{2}\.\d+")
+
+video_id_re = re.compile(r"(?:v=|youtu\.be/|/shorts/|/embed/)([0-9A-Za-z_-]{11})")
+
+SKIP_PREFIXES = ("WEBVTT", "Kind:", "Language:")
+
+
+def _strip_tags(line: str) -> str:
+    """
+    Removes <...> markup (WebVTT tags like <c>, <i>, inline timestamps) by
+    copying the runs between tags - no regex engine in the per-line hot path.
+    Unterminated tags are kept as-is, matching what <[^>]*> used to do.
+    """
+    lt = line.find("<")
+    if lt == -1:
+        return line
+
+    parts = []
+    pos = 0
+    while lt != -1:
+        gt = line.find(">", lt + 1)
+        if gt == -1:
+            break
+        parts.append(line[pos:lt])
+        pos = gt + 1
+        lt = line.find("<", pos)
+    parts.append(line[pos:])
+    return "".join(parts)
+
 
 class SubsProvider:
-    def __init__(self):
+    OUTTMPL = "subs.%(ext)s"
+    CACHE_TTL_S = 24 * 3600
+
+    def __init__(self, search_dir: Path = Path(".")):
         self.logger = logging.getLogger("services")
+        # yt-dlp writes straight into the working directory, so resolve it
+        # once instead of on every lookup.
+        self.search_dir = search_dir.resolve()
+        self.session = requests.Session()
+        self._cache_dir = Path.home() / ".cache" / "cruxrec" / "subs"
 
-    def find_subtitle_file(
-        self,
-        pattern: str = "subs.*",
-        search_dir: Path = Path("."),
-    ) -> Optional[Path]:
-        resolved_dir = search_dir.resolve()
-        self.logger.debug(f"Searching for subtitles in directory: {resolved_dir}")
+    def _cache_file(self, url: str, lang: str, auto_sub: bool) -> Optional[Path]:
+        id_match = video_id_re.search(url)
+        if not id_match:
+            return None
+        return self._cache_dir / f"{id_match.group(1)}.{lang}.{auto_sub}.txt"
+
+    def _read_cached(self, cache_file: Optional[Path]) -> str | None:
+        if not cache_file or not cache_file.exists():
+            return None
+        if time.time() - cache_file.stat().st_mtime > self.CACHE_TTL_S:
+            self.logger.debug(f"Subtitle cache '{cache_file}' expired.")
+            return None
+        try:
+            text = cache_file.read_text(encoding="utf-8")
+        except IOError as exc:
+            self.logger.debug(f"Failed to read subtitle cache: {exc}")
+            return None
+        self.logger.debug(f"Using cached subtitles from '{cache_file}'.")
+        return text or None
+
+    def _write_cached(self, cache_file: Optional[Path], text: str) -> None:
+        if not cache_file:
+            return
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(text, encoding="utf-8")
+        except IOError as exc:
+            self.logger.debug(f"Failed to write subtitle cache: {exc}")
+
+    def _fetch_timedtext(self, url: str, lang: str) -> str | None:
+        """
+        Fast path: scrapes the caption track list from the watch page and
+        fetches the subtitles straight from YouTube's timedtext endpoint,
+        skipping yt-dlp's extractor machinery and the disk round-trip.
+        Returns None on any failure so the caller can fall back to yt-dlp.
+        """
+        id_match = video_id_re.search(url)
+        if not id_match:
+            self.logger.debug(f"Could not extract a video id from '{url}'.")
+            return None
+
+        try:
+            page = self.session.get(
+                f"https://www.youtube.com/watch?v={id_match.group(1)}", timeout=30
+            )
+            page.raise_for_status()
+        except requests.RequestException as exc:
+            self.logger.debug(f"Watch page fetch failed: {exc}")
+            return None
+
+        marker = page.text.find("ytInitialPlayerResponse")
+        if marker == -1:
+            self.logger.debug("ytInitialPlayerResponse not found in watch page.")
+            return None
+        brace = page.text.find("{", marker)
+        try:
+            player_response, _ = json.JSONDecoder().raw_decode(page.text, brace)
+            caption_tracks = player_response["captions"][
+                "playerCaptionsTracklistRenderer"
+            ]["captionTracks"]
+        except (ValueError, KeyError):
+            self.logger.debug("No caption tracks in player response.")
+            return None
+
+        candidates = [t for t in caption_tracks if t.get("languageCode") == lang]
+        # Prefer official tracks over auto-generated ('asr') ones.
+        candidates.sort(key=lambda t: t.get("kind") == "asr")
+        if not candidates:
+            self.logger.debug(f"No caption track for language '{lang}'.")
+            return None
+
+        try:
+            track = self.session.get(
+                f"{candidates[0]['baseUrl']}&fmt=json3", timeout=30
+            )
+            track.raise_for_status()
+            events = track.json().get("events", [])
+        except (requests.RequestException, ValueError) as exc:
+            self.logger.debug(f"Timedtext fetch failed: {exc}")
+            return None
+
+        def iter_event_lines() -> Iterator[str]:
+            for event in events:
+                text = "".join(seg.get("utf8", "") for seg in event.get("segs", []))
+                for line in text.splitlines():
+                    yield line
+
+        return "\n".join(self._iter_clean(iter_event_lines()))
 
-        matched_files = list(resolved_dir.rglob(pattern))
+    def find_subtitle_file(self, pattern: str = "subs.*") -> Optional[Path]:
+        matched_files = sorted(self.search_dir.glob(pattern))
         if not matched_files:
             self.logger.debug(f"No files matching pattern '{pattern}' were found.")
             return None
 
-        self.logger.debug("Found the following subtitle files:")
-        for file in matched_files:
-            self.logger.debug(f" - {file}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Found the following subtitle files:")
+            for file in matched_files:
+                self.logger.debug(f" - {file}")
         return matched_files[0]
 
-    def fetch_subtitles(
+    def _download_subtitles(
+        self, url: str, lang: str, write_sub: bool, write_auto: bool
+    ) -> bool:
+        ydl_opts = {
+            "skip_download": True,
+            "outtmpl": self.OUTTMPL,
+            "writesubtitles": write_sub,
+            "writeautomaticsub": write_auto,
+            "subtitleslangs": [lang] if lang else None,
+        }
+        try:
+            with YoutubeDL(ydl_opts) as ydl:
+                self.logger.debug(
+                    f"Starting subtitles download "
+                    f"(official={write_sub}, auto={write_auto}), lang='{lang}'"
+                )
+                ydl.download([url])
+            return True
+        except Exception as exc:
+            self.logger.warning("Error downloading subtitles", exc_info=exc)
+            return False
+
+    async def fetch_subtitles_async(
         self,
         url: str,
         lang: str = "ru",
         auto_sub: bool = False,
     ) -> str | None:
-        outtmpl = "subs.%(ext)s"
-
-        def download_subtitles(write_auto: bool) -> bool:
-            ydl_opts = {
-                "skip_download": True,
-                "outtmpl": outtmpl,
-                "writesub": not write_auto,
-                "writeautomaticsub": write_auto,
-                "subtitleslangs": [lang] if lang else None,
-            }
-            try:
-                with YoutubeDL(ydl_opts) as ydl:
-                    self.logger.debug(
-                        f"Starting subtitles download (auto={write_auto}), lang='{lang}'"
-                    )
-                    ydl.download([url])
-                return True
-            except Exception as exc:
-                self.logger.warning("Error downloading subtitles", exc_info=exc)
-                return False
-
-        download_subtitles(auto_sub)
-
-        sub_file = self.find_subtitle_file()
-        if sub_file:
-            file_size = sub_file.stat().st_size
-            if file_size == 0:
-                self.logger.debug(
-                    f"Subtitle file '{sub_file}' is empty (size=0). Ignoring."
-                )
-                sub_file = None
+        cache_file = self._cache_file(url, lang, auto_sub)
+        cached = self._read_cached(cache_file)
+        if cached:
+            return cached
 
-        if not sub_file and not auto_sub:
-            self.logger.debug(
-                "Official subtitles not found or empty, trying auto-generated subtitles..."
-            )
-            if not download_subtitles(True):
-                self.logger.debug("Fallback download (auto-sub) failed.")
-                return None
-            sub_file = self.find_subtitle_file()
-            if sub_file and sub_file.stat().st_size == 0:
-                self.logger.debug("Fallback subtitle file is empty.")
-                sub_file = None
+        subtitles_text = await asyncio.to_thread(self._fetch_timedtext, url, lang)
+        if subtitles_text and subtitles_text.strip():
+            self._write_cached(cache_file, subtitles_text)
+            return subtitles_text
+        self.logger.debug("Timedtext fast path failed, falling back to yt-dlp.")
 
+        # A leftover subtitle file from a previous video would be picked up
+        # (and even make yt-dlp skip the download), so clear matches first
+        # and only look for the language we asked for.
+        pattern = f"subs.{lang}.*" if lang else "subs.*"
+        self.remove_subtitles(pattern)
+
+        # One yt-dlp pass requests both variants; yt-dlp itself prefers
+        # official subtitles over auto-generated ones per language.
+        await asyncio.to_thread(
+            self._download_subtitles, url, lang, not auto_sub, True
+        )
+
+        sub_file = self.find_subtitle_file(pattern)
         if not sub_file:
-            self.logger.debug("Could not locate a valid downloaded subtitle file.")
+            self.logger.debug("Could not locate a downloaded subtitle file.")
+            return None
+        if sub_file.stat().st_size == 0:
+            self.logger.debug(f"Subtitle file '{sub_file}' is empty (size=0). Ignoring.")
             return None
 
         subtitles_text = self.parse_subtitle(str(sub_file))
         if not subtitles_text.strip():
-            self.logger.debug("Parsed subtitles are empty.")
+            self.logger.debug(f"Parsed subtitles from '{sub_file}' are empty.")
             return None
-
+        self._write_cached(cache_file, subtitles_text)
         return subtitles_text
 
-    def parse_subtitle(self, subtitle_path: str) -> str:
-        timestamp_re = re.compile(
-            r"^\d{2}:\d{2}:\d{2}\.\d+\s*-->\s*\d{2}:\d{2}:\d{2}\.\d+"
-        )
-        html_tag_re = re.compile(r"<[^>]*>")
-        try:
-            with open(subtitle_path, "r", encoding="utf-8") as f:
-                lines = f.read().splitlines()
-        except IOError as e:
-            raise IOError(f"Error reading file '{subtitle_path}': {e}")
+    def fetch_subtitles(
+        self,
+        url: str,
+        lang: str = "ru",
+        auto_sub: bool = False,
+    ) -> str | None:
+        return asyncio.run(self.fetch_subtitles_async(url, lang, auto_sub))
 
-        cleaned_lines: List[str] = []
+    def _iter_clean(self, lines: Iterable[str]) -> Iterator[str]:
+        """Yields cleaned subtitle lines one at a time, without buffering the file."""
         prev_line = None
 
         for line in lines:
@@ -108,42 +237,37 @@ class SubsProvider:
             if not line:
                 continue
 
-            if (
-                line.startswith("WEBVTT")
-                or line.startswith("Kind:")
-                or line.startswith("Language:")
-            ):
+            if line.startswith(SKIP_PREFIXES):
                 continue
 
-            if timestamp_re.match(line):
+            if "-->" in line and timestamp_re.match(line):
                 continue
 
-            line = html_tag_re.sub("", line).strip()
+            line = _strip_tags(line).strip()
             if not line:
                 continue
 
             if line != prev_line:
-                cleaned_lines.append(line)
+                yield line
                 prev_line = line
 
-        return "\n".join(cleaned_lines)
+    def parse_subtitle(self, subtitle_path: str) -> str:
+        try:
+            with open(subtitle_path, "r", encoding="utf-8") as f:
+                return "\n".join(self._iter_clean(f))
+        except IOError as e:
+            raise IOError(f"Error reading file '{subtitle_path}': {e}")
 
-    def remove_subtitles(
-        self,
-        pattern: str = "subs.*",
-        search_dir: Path = Path("."),
-    ) -> None:
-        resolved_dir = search_dir.resolve()
+    def remove_subtitles(self, pattern: str = "subs.*") -> None:
         deleted_files = 0
-        for sub_file in resolved_dir.rglob(pattern):
-            try:
-                sub_file.unlink()
-                self.logger.debug(f"Removed subtitle file: {sub_file}")
+        with os.scandir(self.search_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not fnmatch.fnmatch(entry.name, pattern):
+                    continue
+                Path(entry.path).unlink(missing_ok=True)
                 deleted_files += 1
-            except Exception as exc:
-                self.logger.warning(
-                    f"Failed to remove file '{sub_file}': {exc}", exc_info=exc
-                )
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(f"Removed subtitle file: {entry.path}")
 
         if deleted_files:
             self.logger.info(f"Removed {deleted_files} subtitle file(s).")
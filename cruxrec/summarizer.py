@@ -13,6 +13,18 @@ class Summarizer(ABC):
 class GeminiSummarizer(Summarizer):
     BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
 
+    # Static instructions are kept byte-identical across all calls and sent
+    # first, so the provider can serve them from its prompt-prefix cache.
+    # Dynamic content (user prompt, subtitles) always comes after.
+    SYSTEM_PROMPT = (
+        "You are CruxRec, an assistant that turns raw YouTube subtitle text "
+        "into a concise digest. You receive a user instruction followed by the "
+        "subtitle text. Keep only the essential information, drop filler, "
+        "greetings, sponsor reads and repeated lines, and answer in the "
+        "language of the subtitles unless the instruction says otherwise. "
+        "Reply with the digest text only, without any preamble."
+    )
+
     def __init__(self, key: str, prompt: str, timeout: float = 100.0) -> None:
         self.key = key
         self.prompt = prompt
@@ -21,8 +33,15 @@ class GeminiSummarizer(Summarizer):
 
     def summarize(self, text: str) -> str | None:
         url = f"{self.BASE_URL}?key={self.key}"
-        full_prompt = f"{self.prompt}:\n\n{text}"
-        data = {"contents": [{"parts": [{"text": full_prompt}]}]}
+        data = {
+            "system_instruction": {"parts": [{"text": self.SYSTEM_PROMPT}]},
+            "contents": [
+                {
+                    "role": "user",
+                    "parts": [{"text": f"{self.prompt}:\n\n{text}"}],
+                }
+            ],
+        }
         headers = {"Content-Type": "application/json"}
         try:
             response = self.session.post(
@@ -0,0 +1,90 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Iterator
+
+whitespace_re = re.compile(r"[ \t]+")
+format_re = re.compile(r"[*_#>`~]+")
+sentence_split_re = re.compile(r"(?<=[.!?…])\s+")
+word_re = re.compile(r"\w+", re.UNICODE)
+
+# Small built-in stopword sets; enough for auto-generated subtitle filler
+# without dragging in NLTK and its corpus downloads.
+STOPWORDS = {
+    "en": frozenset(
+        "a an the and or but if then so is are was were be been being am do "
+        "does did to of in on at for with as by that this these those it its "
+        "i you he she we they them his her my your our not no yes just like "
+        "really very there here what which who when how".split()
+    ),
+    "ru": frozenset(
+        "и в во не что он на я с со как а то все она так его но да ты к у же "
+        "вы за бы по только ее мне было вот от меня еще нет о из ему теперь "
+        "когда даже ну вдруг ли если уже или ни быть был него до вас нибудь "
+        "опять уж вам ведь там потом себя ничего ей может они тут где есть "
+        "надо ней для мы тебя их чем была сам чтоб без будто чего раз тоже "
+        "себе под будет ж тогда кто этот".split()
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def _stopwords(language: str) -> frozenset:
+    return STOPWORDS.get(language.split("-")[0].lower(), frozenset())
+
+
+def _shingles(words: list, size: int = 3) -> set:
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _iter_unique_sentences(text: str) -> Iterator[str]:
+    """
+    Yields sentences, dropping those that nearly repeat the previous kept
+    one - adjacent auto-subtitle cues overlap heavily.
+    """
+    prev_shingles: set = set()
+    for sentence in sentence_split_re.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        shingles = _shingles([w.lower() for w in word_re.findall(sentence)])
+        if shingles and prev_shingles:
+            overlap = len(shingles & prev_shingles) / len(shingles | prev_shingles)
+            if overlap > 0.8:
+                continue
+        yield sentence
+        prev_shingles = shingles
+
+
+def reduce(text: str, mode: str = "off", language: str = "en") -> str:
+    """
+    Shrinks subtitle text before it is sent to the LLM.
+
+    Modes:
+      - "off": return the text unchanged.
+      - "light": collapse whitespace, strip markdown-ish formatting and drop
+        near-duplicate sentences.
+      - "moderate": "light" plus stopword removal for the given language.
+    """
+    if mode == "off":
+        return text
+
+    text = format_re.sub("", text)
+    text = whitespace_re.sub(" ", text)
+
+    sentences = _iter_unique_sentences(text)
+    if mode == "moderate":
+        stopwords = _stopwords(language)
+        if stopwords:
+            sentences = (
+                " ".join(w for w in s.split(" ") if w.lower() not in stopwords)
+                for s in sentences
+            )
+
+    reduced = "\n".join(s for s in sentences if s)
+    logging.getLogger("services").debug(
+        f"Token reduction ({mode}): {len(text)} -> {len(reduced)} chars."
+    )
+    return reduced
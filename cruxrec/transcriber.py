@@ -1,13 +1,28 @@
 import os
 import asyncio
+import hashlib
 import logging
 import tempfile
+import time
+from pathlib import Path
 from urllib.parse import urlparse
 from contextlib import asynccontextmanager
 
+import httpx
 from yt_dlp import YoutubeDL
 from openai import OpenAI
 
+from subs_provider import video_id_re
+
+# extract_info is a full YouTube page fetch; within one process the metadata
+# does not change, so cache it per URL (e.g. a speculative download that got
+# cancelled and later retried should not pay for a second extraction).
+_video_info_cache: dict = {}
+
+# Temp audio artifacts are written once and read once; put them on tmpfs
+# when available instead of going through the disk.
+TEMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
 
 class Transcriber:
     """
@@ -16,6 +31,21 @@ class Transcriber:
     The only public method is transcribe_from_url which requires only a video URL.
     """
 
+    MAX_DURATION_S = 3600
+    CHUNK_SECONDS = 30
+    MAX_CONCURRENT_REQUESTS = 5
+    CACHE_TTL_S = 24 * 3600
+
+    # Audio codecs the Whisper API accepts as-is, mapped to a container
+    # extension they can be stream-copied into.
+    COPY_CODEC_EXTENSIONS = {
+        "aac": ".m4a",
+        "mp3": ".mp3",
+        "opus": ".ogg",
+        "vorbis": ".ogg",
+        "flac": ".flac",
+    }
+
     def __init__(
         self,
         whisper_api_key: str,
@@ -32,18 +62,54 @@ class Transcriber:
         self.default_language = default_language
         self.cookies_path = cookies_path
         self.logger = logging.getLogger("serivces")
+        # One client per transcriber: a fresh OpenAI() per request would pay
+        # the TCP+TLS handshake again for every chunk.
+        self._openai = OpenAI(
+            api_key=whisper_api_key,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+                timeout=60,
+            ),
+        )
+        self._cache_dir = Path.home() / ".cache" / "cruxrec" / "transcripts"
 
-    async def transcribe_from_url(self, url: str, max_duration_s: int = 300) -> str:
+    def _transcript_cache_file(self, url: str) -> Path:
+        id_match = video_id_re.search(url)
+        name = (
+            id_match.group(1)
+            if id_match
+            else hashlib.sha256(url.encode("utf-8")).hexdigest()
+        )
+        return self._cache_dir / f"{name}.txt"
+
+    async def transcribe_from_url(
+        self,
+        url: str,
+        max_duration_s: int = MAX_DURATION_S,
+    ) -> str:
         """
         Public method to transcribe a video from its URL.
-        1. Downloads the video.
+        1. Downloads the video (reusing prefetched metadata when available).
         2. Extracts audio using ffmpeg.
         3. Transcribes audio via the Whisper API; falls back to speech_recognition on error.
 
         :param url: Video URL.
-        :param max_duration_s: Maximum allowed duration (default is 5 minutes).
+        :param max_duration_s: Maximum allowed duration (default is 1 hour).
         :return: Transcribed text or empty string on error.
         """
+        cache_file = self._transcript_cache_file(url)
+        if (
+            cache_file.exists()
+            and time.time() - cache_file.stat().st_mtime <= self.CACHE_TTL_S
+        ):
+            try:
+                cached = cache_file.read_text(encoding="utf-8")
+            except IOError:
+                cached = ""
+            if cached:
+                self.logger.info(f"Using cached transcription from '{cache_file}'.")
+                return cached
+
         video_file = None
         transcription = ""
         try:
@@ -58,42 +124,151 @@ class Transcriber:
         finally:
             if video_file and os.path.exists(video_file):
                 os.remove(video_file)
+
+        if transcription:
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                cache_file.write_text(transcription, encoding="utf-8")
+            except IOError as exc:
+                self.logger.debug(f"Failed to write transcription cache: {exc}")
         return transcription
 
-    async def _download_video(self, url: str, max_duration_s: int) -> str:
-        """
-        Private method to download a video using yt-dlp.
-        Uses a template with the hostname and %(id)s to ensure uniqueness.
-        """
+    def _ydl_opts(self, url: str) -> dict:
         parsed_url = urlparse(url)
-        ydl_opts = {
+        return {
             "cookies": self.cookies_path,
             "outtmpl": f"{parsed_url.hostname}-%(id)s.%(ext)s",
             "noplaylist": True,
             "quiet": True,
+            # Only the audio stream is ever used; skip the video bytes.
+            "format": "bestaudio/best",
         }
+
+    async def prefetch_video_info(self, url: str) -> None:
+        """
+        Warms the metadata cache so a later _download_video call can skip
+        extract_info. Safe to cancel: no files are written, only the
+        already-running extract_info thread is left to wind down.
+        """
+        if url in _video_info_cache:
+            return
+        with YoutubeDL(self._ydl_opts(url)) as ydl:
+            info_dict = await asyncio.to_thread(ydl.extract_info, url, download=False)
+            if info_dict:
+                _video_info_cache[url] = info_dict
+
+    def _download_blocking(self, ydl: YoutubeDL, url: str) -> None:
+        """
+        Runs the actual yt-dlp download in the calling (worker) thread; on
+        failure cleans up leftover files here, after yt-dlp has really
+        stopped writing them.
+        """
+        try:
+            ydl.download([url])
+        except BaseException:
+            self._cleanup_partial_downloads(url)
+            raise
+
+    async def _download_video(self, url: str, max_duration_s: int) -> str:
+        """
+        Private method to download a video's audio using yt-dlp.
+        Uses a template with the hostname and %(id)s to ensure uniqueness.
+        The blocking yt-dlp calls run in worker threads so the event loop
+        (and with it the concurrent subtitle fetch) keeps turning.
+        """
+        ydl_opts = self._ydl_opts(url)
         self.logger.info("yt-dlp options: %r", ydl_opts)
         with YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(url, download=False)
-            if not info_dict:
-                raise RuntimeError(
-                    "extract_info returned None. Check the URL or yt-dlp settings."
+            info_dict = _video_info_cache.get(url)
+            if info_dict is None:
+                info_dict = await asyncio.to_thread(
+                    ydl.extract_info, url, download=False
                 )
+                if not info_dict:
+                    raise RuntimeError(
+                        "extract_info returned None. Check the URL or yt-dlp settings."
+                    )
+                _video_info_cache[url] = info_dict
+            else:
+                self.logger.debug(f"Reusing cached video metadata for '{url}'.")
             video_duration = info_dict.get("duration", 0)
             if video_duration <= max_duration_s:
-                ydl.download([url])
+                await asyncio.to_thread(self._download_blocking, ydl, url)
                 return ydl.prepare_filename(info_dict)
             else:
-                raise ValueError("Video is longer than allowed 5 minutes")
+                raise ValueError(
+                    f"Video is longer than allowed {max_duration_s} seconds"
+                )
+
+    def _cleanup_partial_downloads(self, url: str) -> None:
+        """
+        Removes any (partial) files left behind by a failed download,
+        matching the hostname-based output template it uses.
+        """
+        parsed_url = urlparse(url)
+        for leftover in Path(".").glob(f"{parsed_url.hostname}-*"):
+            try:
+                leftover.unlink()
+                self.logger.debug(f"Removed partial download: {leftover}")
+            except OSError as exc:
+                self.logger.warning(
+                    f"Failed to remove partial download '{leftover}': {exc}"
+                )
+
+    async def _probe_codec(self, media_path: str) -> str:
+        """Returns the codec name of the first audio stream via ffprobe."""
+        codec_command = [
+            "ffprobe",
+            "-v",
+            "error",
+            "-select_streams",
+            "a:0",
+            "-show_entries",
+            "stream=codec_name",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            media_path,
+        ]
+        process = await asyncio.create_subprocess_exec(
+            *codec_command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, _ = await process.communicate()
+        return stdout.decode().strip()
 
     @asynccontextmanager
     async def _extract_audio(self, video_file: str):
         """
         Private asynchronous context manager to extract audio using ffmpeg.
-        Creates a temporary m4a audio file.
+        When the audio stream is a codec Whisper accepts directly, it is
+        demuxed with a stream copy (no decode+encode pass); otherwise it is
+        re-encoded to a temporary m4a file.
         """
-        audio_file = video_file.rsplit(".", 1)[0] + ".m4a"
-        command = ["ffmpeg", "-i", video_file, "-q:a", "0", "-map", "a", audio_file]
+        codec = await self._probe_codec(video_file)
+        extension = self.COPY_CODEC_EXTENSIONS.get(codec)
+        stem = os.path.splitext(os.path.basename(video_file))[0]
+        if extension:
+            audio_file = os.path.join(TEMP_DIR, stem + extension)
+            command = ["ffmpeg", "-i", video_file, "-vn", "-acodec", "copy", audio_file]
+        else:
+            # Whisper downmixes to 16kHz mono internally, so encode straight
+            # to that - the upload shrinks accordingly.
+            audio_file = os.path.join(TEMP_DIR, stem + ".m4a")
+            command = [
+                "ffmpeg",
+                "-i",
+                video_file,
+                "-q:a",
+                "0",
+                "-map",
+                "a",
+                "-ac",
+                "1",
+                "-ar",
+                "16000",
+                audio_file,
+            ]
         process = None
         try:
             process = await asyncio.create_subprocess_exec(
@@ -114,58 +289,110 @@ class Transcriber:
     async def _transcribe_audio(self, audio_path: str) -> str:
         """
         Private method to transcribe audio.
-        Checks the audio codec using ffprobe and converts to PCM WAV if needed.
-        Tries transcription via the Whisper API and falls back to speech_recognition on error.
+        The Whisper API accepts compressed audio (m4a/mp3/ogg/...) directly,
+        so the file is posted as-is - no PCM WAV re-encode on this path.
+        Falls back to speech_recognition on error.
         """
-        wav_audio_path = None
-        codec_command = [
+        try:
+            self.logger.info(f"Transcribing {audio_path} via Whisper API...")
+            chunk_dir, chunk_paths = await self._split_audio(audio_path)
+            if not chunk_paths:
+                return await asyncio.to_thread(self._whisper_request, audio_path)
+
+            try:
+                semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+                texts = await asyncio.gather(
+                    *(self._whisper_one(chunk, semaphore) for chunk in chunk_paths)
+                )
+                return " ".join(text for text in texts if text)
+            finally:
+                for chunk in chunk_paths:
+                    if os.path.exists(chunk):
+                        os.remove(chunk)
+                if chunk_dir and os.path.isdir(chunk_dir):
+                    os.rmdir(chunk_dir)
+        except Exception as e:
+            self.logger.exception("Error using Whisper API:", exc_info=e)
+            self.logger.error("Falling back to speech_recognition...")
+            return ""
+
+    async def _probe_duration(self, audio_path: str) -> float:
+        """Returns the audio duration in seconds via ffprobe (0.0 on failure)."""
+        duration_command = [
             "ffprobe",
             "-v",
             "error",
-            "-select_streams",
-            "a:0",
             "-show_entries",
-            "stream=codec_name",
+            "format=duration",
             "-of",
             "default=noprint_wrappers=1:nokey=1",
             audio_path,
         ]
-        codec_process = await asyncio.create_subprocess_exec(
-            *codec_command,
+        process = await asyncio.create_subprocess_exec(
+            *duration_command,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
-        codec_stdout, codec_stderr = await codec_process.communicate()
-        codec = codec_stdout.decode().strip()
-
+        stdout, _ = await process.communicate()
         try:
-            if codec != "pcm_s16le":
-                wav_audio_path = tempfile.mktemp(suffix=".wav")
-                conversion_command = [
-                    "ffmpeg",
-                    "-i",
-                    audio_path,
-                    "-acodec",
-                    "pcm_s16le",
-                    "-y",
-                    wav_audio_path,
-                ]
-                proc = await asyncio.create_subprocess_exec(*conversion_command)
-                await proc.communicate()
-                audio_path = wav_audio_path
-                self.logger.info(f"Audio converted to WAV: {wav_audio_path}")
+            return float(stdout.decode().strip())
+        except ValueError:
+            return 0.0
 
-            self.logger.info(f"Transcribing {audio_path} via Whisper API...")
-            client = OpenAI(api_key=self.whisper_api_key)
-            with open(audio_path, "rb") as audio_file:
-                transcript = client.audio.transcriptions.create(
-                    model="Systran/faster-whisper-medium", file=audio_file
-                )
-                return transcript.text
-        except Exception as e:
-            self.logger.exception("Error using Whisper API:", exc_info=e)
-            self.logger.error("Falling back to speech_recognition...")
-            return ""
-        finally:
-            if wav_audio_path and os.path.exists(wav_audio_path):
-                os.remove(wav_audio_path)
+    async def _split_audio(self, audio_path: str) -> tuple[str | None, list[str]]:
+        """
+        Splits the audio into ~CHUNK_SECONDS segments with a single ffmpeg
+        stream-copy pass (no re-encode). Returns (chunk_dir, chunk_paths);
+        (None, []) means the audio is short enough to send as one request.
+        """
+        duration = await self._probe_duration(audio_path)
+        if duration <= self.CHUNK_SECONDS:
+            return None, []
+
+        chunk_dir = tempfile.mkdtemp(prefix="whisper_chunks_", dir=TEMP_DIR)
+        suffix = os.path.splitext(audio_path)[1] or ".wav"
+        segment_command = [
+            "ffmpeg",
+            "-i",
+            audio_path,
+            "-f",
+            "segment",
+            "-segment_time",
+            str(self.CHUNK_SECONDS),
+            "-c",
+            "copy",
+            "-y",
+            os.path.join(chunk_dir, f"chunk_%03d{suffix}"),
+        ]
+        process = await asyncio.create_subprocess_exec(
+            *segment_command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            os.rmdir(chunk_dir)
+            raise RuntimeError(
+                f"ffmpeg segmenting exited with code {process.returncode}\n{stderr.decode()}"
+            )
+
+        chunk_paths = sorted(
+            os.path.join(chunk_dir, name) for name in os.listdir(chunk_dir)
+        )
+        self.logger.info(
+            f"Split {duration:.0f}s audio into {len(chunk_paths)} chunk(s)."
+        )
+        return chunk_dir, chunk_paths
+
+    def _whisper_request(self, audio_path: str) -> str:
+        with open(audio_path, "rb") as audio_file:
+            transcript = self._openai.audio.transcriptions.create(
+                model="Systran/faster-whisper-medium", file=audio_file
+            )
+        return transcript.text
+
+    async def _whisper_one(
+        self, audio_path: str, semaphore: asyncio.Semaphore
+    ) -> str:
+        async with semaphore:
+            return await asyncio.to_thread(self._whisper_request, audio_path)
@@ -18,6 +18,12 @@ setup(
         "yt-dlp",
         "openai",
     ],
+    extras_require={
+        "speed": [
+            "orjson",
+            "blake3",
+        ],
+    },
     entry_points={
         "console_scripts": [
             "cruxrec=cruxrec.cli:main",